@@ -1,9 +1,13 @@
 import oracledb
 import os
+import functools
 import getpass
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, TextIO
 
 # Configuração de logging
 logging.basicConfig(
@@ -16,53 +20,81 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Retorna CLOBs (DESCRTAB/DESCRCAMPO em alguns dicionários Sankhya) como
+# str direto, evitando um round-trip extra de rede por LOB lido
+oracledb.defaults.fetch_lobs = False
+
+# Escapa '|' e achata quebras de linha que quebrariam a tabela Markdown
+_MD_ESCAPE = str.maketrans({'|': '\\|', '\n': ' '})
+
+# Template da linha de coluna com o .format pré-vinculado: uma chamada
+# por linha, sem reavaliar as expressões de um f-string no loop quente
+_ROW_FMT = "| `{}` | {} | {}{} |\n".format
+
+# Consulta única por prefixo: tabelas e colunas em um JOIN, ordenadas
+# por tabela e posição da coluna para o agrupamento em Python
+_SCHEMA_SQL = """
+    SELECT t.NOMETAB, t.DESCRTAB, c.NOMECAMPO, c.DESCRCAMPO, c.TIPCAMPO, c.TAMANHO
+    FROM TDDTAB t
+    LEFT JOIN TDDCAM c ON c.NOMETAB = t.NOMETAB
+    WHERE t.NOMETAB LIKE :prefix
+    ORDER BY t.NOMETAB, c.ORDEM
+"""
+
+def _load_env_file() -> None:
+    """Carrega variáveis de ambiente de um arquivo .env se existir"""
+    env_file = Path('.env')
+    if env_file.exists():
+        logger.info("Carregando configurações do arquivo .env...")
+        text = env_file.read_text(encoding='utf-8')
+        pairs = (
+            line.split('=', 1)
+            for line in map(str.strip, text.splitlines())
+            if line and not line.startswith('#') and '=' in line
+        )
+        os.environ.update({key.strip(): value.strip() for key, value in pairs})
+    else:
+        logger.warning("Arquivo .env não encontrado. Usando variáveis de ambiente do sistema.")
+
+
+# Cache: instanciar o extrator várias vezes não relê o .env nem revalida
+# o ambiente (testes podem limpar com _load_config.cache_clear())
+@functools.lru_cache(maxsize=1)
+def _load_config() -> Dict[str, Any]:
+    """Carrega e valida configurações"""
+    _load_env_file()
+
+    config = {
+        'db_user': os.environ.get("DB_USER"),
+        'db_host': os.environ.get("DB_HOST"),
+        'db_port': os.environ.get("DB_PORT", "1521"),
+        'db_service': os.environ.get("DB_SERVICE"),
+        'db_password': os.environ.get("DB_PASSWORD")
+    }
+
+    # Validação de configurações obrigatórias
+    missing_configs = []
+    for key, value in config.items():
+        if key in ['db_user', 'db_host'] and not value:
+            missing_configs.append(key.upper())
+
+    if missing_configs:
+        raise ValueError(f"Configurações obrigatórias não encontradas: {', '.join(missing_configs)}")
+
+    return config
+
+
 class SankhyaSchemaExtractor:
     """Classe para extração do schema do Sankhya"""
-    
+
     def __init__(self):
-        self.config = self._load_config()
+        self.config = _load_config()
+        self.pool: Optional[oracledb.ConnectionPool] = None
         self.stats = {
             'tables_processed': 0,
             'columns_processed': 0,
             'errors': 0
         }
-    
-    def _load_env_file(self) -> None:
-        """Carrega variáveis de ambiente de um arquivo .env se existir"""
-        env_file = Path('.env')
-        if env_file.exists():
-            logger.info("Carregando configurações do arquivo .env...")
-            with open(env_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        os.environ[key] = value
-        else:
-            logger.warning("Arquivo .env não encontrado. Usando variáveis de ambiente do sistema.")
-
-    def _load_config(self) -> Dict[str, Any]:
-        """Carrega e valida configurações"""
-        self._load_env_file()
-        
-        config = {
-            'db_user': os.environ.get("DB_USER"),
-            'db_host': os.environ.get("DB_HOST"),
-            'db_port': os.environ.get("DB_PORT", "1521"),
-            'db_service': os.environ.get("DB_SERVICE"),
-            'db_password': os.environ.get("DB_PASSWORD")
-        }
-        
-        # Validação de configurações obrigatórias
-        missing_configs = []
-        for key, value in config.items():
-            if key in ['db_user', 'db_host'] and not value:
-                missing_configs.append(key.upper())
-        
-        if missing_configs:
-            raise ValueError(f"Configurações obrigatórias não encontradas: {', '.join(missing_configs)}")
-        
-        return config
 
     def _get_password(self) -> str:
         """Solicita senha de forma segura se não fornecida"""
@@ -71,29 +103,37 @@ class SankhyaSchemaExtractor:
             self.config['db_password'] = getpass.getpass(f"Digite a senha para {self.config['db_user']}: ")
         return self.config['db_password']
 
-    def _create_connection(self) -> oracledb.Connection:
-        """Cria conexão com o banco Oracle"""
+    def _create_pool(self) -> oracledb.ConnectionPool:
+        """Cria um pool de sessões com o banco Oracle"""
         try:
-            # Configurar o modo thin para evitar problemas de bequeath
-            oracledb.init_oracle_client()
-            
+            # Modo thin (padrão): dispensa o Oracle Instant Client e acelera
+            # a inicialização. Defina ORACLE_THICK=1 se o deploy exigir thick.
+            if os.environ.get("ORACLE_THICK") == "1":
+                oracledb.init_oracle_client()
+
             connection_string = f"{self.config['db_host']}:{self.config['db_port']}/{self.config['db_service']}"
-            
+
             logger.info(f"Conectando ao Oracle Database:")
             logger.info(f"  Host: {self.config['db_host']}")
             logger.info(f"  Port: {self.config['db_port']}")
             logger.info(f"  Service: {self.config['db_service']}")
             logger.info(f"  User: {self.config['db_user']}")
-            
-            connection = oracledb.connect(
+
+            # Pool de sessões: evita o custo de login a cada execução e
+            # permite buscas em conexões paralelas
+            pool = oracledb.create_pool(
                 user=self.config['db_user'],
                 password=self._get_password(),
-                dsn=connection_string
+                dsn=connection_string,
+                min=2,
+                max=8,
+                increment=1,
+                getmode=oracledb.POOL_GETMODE_WAIT
             )
-            
-            logger.info(f"Conexão estabelecida com sucesso! Versão Oracle: {connection.version}")
-            return connection
-            
+
+            logger.info("Pool de sessões criado com sucesso!")
+            return pool
+
         except oracledb.Error as e:
             logger.error(f"Erro ao conectar ao Oracle Database: {e}")
             self._print_troubleshooting_tips()
@@ -102,109 +142,128 @@ class SankhyaSchemaExtractor:
     def _print_troubleshooting_tips(self) -> None:
         """Exibe dicas para resolução de problemas"""
         logger.error("\n=== DICAS PARA RESOLUÇÃO ===")
-        logger.error("1. Verifique se o Oracle Client está instalado")
+        logger.error("1. Se ORACLE_THICK=1, verifique se o Oracle Client está instalado")
         logger.error("2. Verifique se as variáveis de ambiente estão corretas")
         logger.error("3. Verifique se o servidor Oracle está acessível")
         logger.error("4. Tente usar uma string de conexão completa")
         logger.error("5. Verifique se o usuário tem permissões necessárias")
 
-    def extract_schema(self, connection: oracledb.Connection) -> str:
+    # Prefixos de tabela do Sankhya, extraídos de forma independente.
+    # A ordem fixa segue o ORDER BY NOMETAB original (TCB → TGF → TSI),
+    # mantendo o sankhya_schema.md gerado idêntico entre execuções.
+    TABLE_PREFIXES = ('TCB%', 'TGF%', 'TSI%')
+
+    def _extract_prefix(self, prefix: str) -> tuple:
+        """Extrai o dicionário das tabelas de um prefixo em uma conexão própria.
+
+        Retorna o fragmento Markdown do prefixo e os contadores locais,
+        consolidados pela thread principal para evitar disputa em `stats`.
         """
-        Extrai o schema de tabelas do Sankhya e formata em Markdown.
-        
+        parts = []
+        stats = {'tables_processed': 0, 'columns_processed': 0, 'errors': 0}
+
+        # Um cursor dedicado por consulta, com arraysize/prefetchrows
+        # ajustados ao formato dela e fechado junto com o bloco
+        with self.pool.acquire() as connection, connection.cursor() as cursor:
+            # Busca em lote: a iteração direta do cursor busca arraysize linhas
+            # por round-trip, mantendo a memória limitada a um lote por vez
+            # (prefetchrows = arraysize + 1, conforme tuning do python-oracledb)
+            cursor.arraysize = 1000
+            cursor.prefetchrows = 1001
+
+            try:
+                logger.info("Buscando tabelas %s do Sankhya...", prefix)
+                cursor.execute(_SCHEMA_SQL, prefix=prefix)
+
+                # Itera o cursor diretamente: o driver alimenta os buffers de
+                # prefetch enquanto o Markdown é montado, sem materializar tudo
+                for (table_name, table_desc), table_rows in groupby(cursor, key=itemgetter(0, 1)):
+                    try:
+                        # Formatação preguiçosa: só formata se o nível INFO estiver ativo
+                        logger.info("Processando tabela: %s", table_name)
+                        parts.append(f"## Tabela: `{table_name}`\n\n")
+
+                        if table_desc:
+                            parts.append(f"**Descrição:** {table_desc}\n\n")
+
+                        parts.append("| Coluna | Descrição | Tipo de Dado |\n")
+                        parts.append("|---|---|---|\n")
+
+                        for _, _, col_name, col_desc, col_type, col_size in table_rows:
+                            if col_name is None:
+                                continue
+                            # Linha inteira em uma única chamada ao template:
+                            # uma formatação e um append por coluna
+                            # (translate limpa '|' e quebras de linha da descrição)
+                            parts.append(_ROW_FMT(
+                                col_name,
+                                col_desc.translate(_MD_ESCAPE) if col_desc else '',
+                                col_type,
+                                f'({col_size})' if col_size else ''
+                            ))
+                            stats['columns_processed'] += 1
+
+                        parts.append("\n")
+                        stats['tables_processed'] += 1
+
+                    except Exception as e:
+                        logger.error("Erro ao processar tabela %s: %s", table_name, e)
+                        stats['errors'] += 1
+                        continue
+
+            except Exception as e:
+                logger.error("Erro durante a extração do schema: %s", e)
+                raise
+
+        return "".join(parts), stats
+
+    def extract_schema(self, out: TextIO) -> None:
+        """
+        Extrai o schema de tabelas do Sankhya, escrevendo o Markdown
+        incrementalmente em `out` para não reter o documento inteiro em RAM.
+
+        Os três prefixos são buscados em paralelo, cada um em uma conexão
+        do pool (o python-oracledb libera o GIL durante as chamadas OCI);
+        os fragmentos são gravados na ordem fixa dos prefixos.
+
         Args:
-            connection: Conexão ativa com o banco Oracle
-            
-        Returns:
-            String formatada em Markdown com o dicionário de dados
+            out: Destino de escrita já aberto (arquivo do dicionário)
         """
-        schema_markdown = "# Dicionário de Dados Sankhya\n\n"
-        cursor = connection.cursor()
+        out.write("# Dicionário de Dados Sankhya\n\n")
 
-        try:
-            # 1. Obter a lista de tabelas relevantes
-            logger.info("Buscando tabelas do Sankhya...")
-            cursor.execute("""
-                SELECT NOMETAB, DESCRTAB
-                FROM TDDTAB
-                WHERE NOMETAB LIKE 'TGF%' OR NOMETAB LIKE 'TSI%' OR NOMETAB LIKE 'TCB%'
-                ORDER BY NOMETAB
-            """)
-            tables = cursor.fetchall()
-            
-            logger.info(f"Encontradas {len(tables)} tabelas para processar")
-
-            for table_name, table_desc in tables:
-                try:
-                    logger.info(f"Processando tabela: {table_name}")
-                    schema_markdown += f"## Tabela: `{table_name}`\n\n"
-                    
-                    if table_desc:
-                        schema_markdown += f"**Descrição:** {table_desc}\n\n"
-                    
-                    schema_markdown += "| Coluna | Descrição | Tipo de Dado |\n"
-                    schema_markdown += "|---|---|---|\n"
-
-                    # 2. Para cada tabela, obter suas colunas
-                    cursor.execute("""
-                        SELECT NOMECAMPO, DESCRCAMPO, TIPCAMPO, TAMANHO
-                        FROM TDDCAM
-                        WHERE NOMETAB = :table_name
-                        ORDER BY ORDEM
-                    """, table_name=table_name)
-                    
-                    columns = cursor.fetchall()
-                    
-                    for col_name, col_desc, col_type, col_size in columns:
-                        data_type = f"{col_type}({col_size})" if col_size else col_type
-                        
-                        # Limpeza para evitar quebras na tabela Markdown
-                        clean_col_desc = col_desc.replace('|', '\\|') if col_desc else ''
-                        schema_markdown += f"| `{col_name}` | {clean_col_desc} | {data_type} |\n"
-                        self.stats['columns_processed'] += 1
-                    
-                    schema_markdown += "\n"
-                    self.stats['tables_processed'] += 1
-                    
-                except Exception as e:
-                    logger.error(f"Erro ao processar tabela {table_name}: {e}")
-                    self.stats['errors'] += 1
-                    continue
+        with ThreadPoolExecutor(max_workers=len(self.TABLE_PREFIXES)) as executor:
+            futures = [executor.submit(self._extract_prefix, prefix)
+                       for prefix in self.TABLE_PREFIXES]
 
-        except Exception as e:
-            logger.error(f"Erro durante a extração do schema: {e}")
-            raise
-        finally:
-            cursor.close()
+            for future in futures:
+                fragment, stats = future.result()
+                out.write(fragment)
+                for key, value in stats.items():
+                    self.stats[key] += value
 
-        return schema_markdown
+    def save_schema(self, filename: str = "sankhya_schema.md") -> None:
+        """Registra estatísticas do schema já gravado em disco"""
+        logger.info(f"Schema salvo com sucesso em '{filename}'")
+        logger.info(f"Estatísticas: {self.stats['tables_processed']} tabelas, "
+                   f"{self.stats['columns_processed']} colunas processadas")
 
-    def save_schema(self, schema_content: str, filename: str = "sankhya_schema.md") -> None:
-        """Salva o schema extraído em arquivo Markdown"""
-        try:
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(schema_content)
-            
-            logger.info(f"Schema salvo com sucesso em '{filename}'")
-            logger.info(f"Estatísticas: {self.stats['tables_processed']} tabelas, "
-                       f"{self.stats['columns_processed']} colunas processadas")
-            
-            if self.stats['errors'] > 0:
-                logger.warning(f"{self.stats['errors']} erros encontrados durante o processamento")
-                
-        except Exception as e:
-            logger.error(f"Erro ao salvar arquivo: {e}")
-            raise
+        if self.stats['errors'] > 0:
+            logger.warning(f"{self.stats['errors']} erros encontrados durante o processamento")
 
-    def run(self) -> None:
+    def run(self, filename: str = "sankhya_schema.md") -> None:
         """Executa o processo completo de extração"""
         try:
-            connection = self._create_connection()
-            
-            with connection:
-                schema_content = self.extract_schema(connection)
-                self.save_schema(schema_content)
-                
+            self.pool = self._create_pool()
+
+            try:
+                # Buffer de 1 MiB: poucas syscalls de escrita mesmo para
+                # dicionários de vários MB; o flush fica por conta do close
+                with open(filename, "w", encoding="utf-8", buffering=1 << 20) as out:
+                    self.extract_schema(out)
+                self.save_schema(filename)
+            finally:
+                self.pool.close()
+
         except Exception as e:
             logger.error(f"Erro durante a execução: {e}")
             raise